@@ -1 +1,15 @@
-from src.lagrangepointgui.orbit_plotter import Plotter
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.lagrangepointgui.orbit_plotter import Plotter
+
+
+def __getattr__(name: str) -> object:
+    # Plotter is imported on first access since importing it loads pyqtgraph and the simulator
+    if name == "Plotter":
+        from src.lagrangepointgui.orbit_plotter import Plotter
+
+        return Plotter
+
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
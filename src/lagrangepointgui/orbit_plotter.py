@@ -2,13 +2,13 @@
 the orbits of the system simulated by an instance of the Simulator class.
 """
 from collections.abc import Callable, Generator
+from concurrent.futures import Executor
 from contextlib import suppress
-from math import ceil
-from typing import TypeAlias, cast
+from math import ceil, hypot
+from typing import TypeAlias
 
 import numpy as np
 import pyqtgraph as pg  # type: ignore[import-untyped]
-from numpy.linalg import norm
 from PyQt6.QtCore import QTimer
 
 from src.lagrangepointsimulator import Simulator
@@ -41,6 +41,49 @@ def _plot_components(plot: pg.PlotWidget, arr: Array2D, times: Array1D) -> None:
         plot.plot(times, arr_component, name=component, pen=pen)
 
 
+STAR_ARGS: PlotArgs = {
+    "pen": "y",
+    "brush": "y",
+    "size": 10,
+}
+
+PLANET_ARGS: PlotArgs = {
+    "pen": "b",
+    "brush": "b",
+    "size": 10,
+}
+
+SAT_ARGS: PlotArgs = {
+    "pen": "g",
+    "brush": "g",
+    "size": 10,
+}
+
+LAGRANGE_POINT_ARGS: PlotArgs = {
+    "pen": "w",
+    "brush": "w",
+    "size": 10,
+}
+
+BODY_NAME_TO_PLOT_ARGS: dict[str, PlotArgs] = {
+    "Star": STAR_ARGS,
+    "Planet": PLANET_ARGS,
+    "Satellite": SAT_ARGS,
+}
+
+
+def _create_orbit_legend(plot: pg.PlotWidget) -> pg.LegendItem:
+    """Adds a legend with an entry for each body to the plot.
+    The entries are stubs which aren't plotted, so they survive plot.clear() and never need to be re-added.
+    """
+    legend: pg.LegendItem = plot.addLegend()
+
+    for name, args in BODY_NAME_TO_PLOT_ARGS.items():
+        legend.addItem(pg.PlotDataItem(pen=args["pen"]), name)
+
+    return legend
+
+
 def _create_conserved_plot(quantity_name: str) -> pg.PlotWidget:
     """Initializes the plot axes and title for the conserved quantities plots."""
     plot = pg.PlotWidget(title=f"Relative Change in {quantity_name} vs Time")
@@ -64,6 +107,13 @@ class Plotter:
         self.corotating_plot = _create_orbit_plot("Orbit in Co-Rotating Coordinate System")
         self.corotating_plot.setAspectLocked(True)
 
+        self._inertial_legend = _create_orbit_legend(self.inertial_plot)
+        self._corotating_legend = _create_orbit_legend(self.corotating_plot)
+
+        # its label is updated to the simulated Lagrange point whenever the corotating orbit is plotted
+        self._lagrange_point_legend_stub = pg.PlotDataItem(pen=LAGRANGE_POINT_ARGS["pen"])
+        self._corotating_legend.addItem(self._lagrange_point_legend_stub, self.sim.lagrange_label)
+
         self.timer = QTimer()
         # 33 milliseconds -> 30 fps
         self.timer.setInterval(33)
@@ -93,8 +143,11 @@ class Plotter:
         with suppress(TypeError):
             self.timer.timeout.disconnect()
 
-        self.timer.timeout.connect(animate_inertial)
-        self.timer.timeout.connect(animate_corotating)
+        def animate_both() -> None:
+            animate_inertial()
+            animate_corotating()
+
+        self.timer.timeout.connect(animate_both)
 
     def plot_index_generator(self) -> Generator[int, None, None]:
         """This generator yields the index of the next point to plot."""
@@ -139,31 +192,9 @@ class Plotter:
         plot.clear()
         plot.disableAutoRange()
 
-        legend: pg.LegendItem = plot.addLegend()
-        legend.clear()
-
-        star_args: PlotArgs = {
-            "pen": "y",
-            "brush": "y",
-            "size": 10,
-            "name": "Star",
-        }
-
-        planet_args: PlotArgs = {
-            "pen": "b",
-            "brush": "b",
-            "size": 10,
-            "name": "Planet",
-        }
-
-        sat_args: PlotArgs = {
-            "pen": "g",
-            "brush": "g",
-            "size": 10,
-            "name": "Satellite",
-        }
-
-        arrays_and_args = ((star_pos, star_args), (planet_pos, planet_args), (sat_pos, sat_args))
+        # the legend entries were added once in __init__
+        # so the bodies are plotted without names to keep them out of the legend
+        arrays_and_args = ((star_pos, STAR_ARGS), (planet_pos, PLANET_ARGS), (sat_pos, SAT_ARGS))
 
         arr_step = self.array_step()
         for arr, args in arrays_and_args:
@@ -173,8 +204,7 @@ class Plotter:
 
         plot.addItem(anim_plot)
 
-        # The purpose of this is to add the bodies to the plot legend
-        # and plot their initial positions
+        # plot the initial positions of the bodies
         for arr, args in arrays_and_args:
             Plotter.plot_point(anim_plot, arr[0], args)
 
@@ -231,17 +261,10 @@ class Plotter:
 
         lagrange_point_plot.addPoints(
             pos=[lagrange_point[:2] / AU],
-            pen="w",
-            brush="w",
-            size=10,
-            name="Lagrange Point",
+            **LAGRANGE_POINT_ARGS,
         )
 
-        plot_data_item = pg.PlotDataItem(pen="w")
-
-        legend: pg.LegendItem = self.corotating_plot.addLegend()
-
-        legend.addItem(plot_data_item, self.sim.lagrange_label)
+        self._corotating_legend.getLabel(self._lagrange_point_legend_stub).setText(self.sim.lagrange_label)
 
     def plot_conserved_quantities(self) -> None:
         """Plots the relative change in the conserved quantities:
@@ -265,12 +288,12 @@ class Plotter:
         total_energy = self._total_energy[::arr_step]
         self.plot_relative_change_in_energy(total_energy, times_in_years)
 
-    def get_conserved_quantities(self) -> None:
+    def get_conserved_quantities(self, executor: Executor | None = None) -> None:
         (
             total_momentum,
             total_angular_momentum,
             total_energy,
-        ) = self.sim.calc_conserved_quantities()
+        ) = self.sim.calc_conserved_quantities(executor)
 
         self._total_momentum = total_momentum
         self._total_angular_momentum = total_angular_momentum
@@ -291,7 +314,7 @@ class Plotter:
         # to avoid this we normalize the total linear momentum
         # by the initial linear momentum of the planet.
 
-        init_planet_momentum = cast(float, (norm(self.sim.planet_mass * self.sim.planet_vel[0])))
+        init_planet_momentum = self.sim.planet_mass * hypot(*self.sim.planet_vel[0])
         normalized_linear_momentum: Array2D = total_momentum / init_planet_momentum
 
         _plot_components(self.linear_momentum_plot, normalized_linear_momentum, times_in_years)
@@ -1,8 +1,11 @@
 """Reads user defined presets and constants for usage in GUI."""
 import os
 import sys
+import threading
+from contextlib import suppress
+from functools import cache, lru_cache
 from pathlib import Path
-from typing import TypeAlias
+from typing import TypeAlias, cast
 
 import tomllib
 
@@ -21,16 +24,128 @@ Bases: TypeAlias = list[str]
 
 ParamPresets: TypeAlias = dict[str, dict[str, Expr | Bases]]
 Constants: TypeAlias = dict[str, float | int]
+# param label: value as the text shown in its input field
+PresetParams: TypeAlias = dict[str, str]
+
+# (modification time, size) of each preset file when it was last read, None if it didn't exist
+_read_stats: dict[Path, tuple[float, int] | None] = {}
+
+# held while the cached presets are computed so that a preload in another thread and the gui don't both read the files
+_cache_lock = threading.RLock()
 
 
 def read_presets() -> tuple[ParamPresets, Constants]:
+    """Returns the default presets and constants merged with the user defined ones.
+    The result is cached and must not be mutated. Call refresh_presets() to pick up changes to the preset files.
+    """
+    with _cache_lock:
+        return _read_presets()
+
+
+def flattened_preset(preset_name: str) -> PresetParams:
+    """Returns the preset with the parameters of its bases merged in, in the order they're applied.
+    The values are converted to the text shown in the input fields.
+    Raises a ValueError if the preset or one of its ancestors isn't defined, other presets are unaffected.
+    The result is cached and must not be mutated.
+    """
+    with _cache_lock:
+        return _flattened_preset(preset_name)
+
+
+def preload_presets() -> None:
+    """Reads the presets and flattens the valid ones so that later calls return the cached results.
+    Safe to call in any thread.
+    """
+    presets, _ = read_presets()
+    for preset_name in presets:
+        # an invalid preset raises again when it's applied
+        with suppress(ValueError):
+            flattened_preset(preset_name)
+
+
+@lru_cache(maxsize=1)
+def _read_presets() -> tuple[ParamPresets, Constants]:
     default_params, default_consts = _read_preset(default_presets_path)
     user_params, user_consts = _read_preset(user_presets_path)
 
     return default_params | user_params, default_consts | user_consts
 
 
+@cache
+def _flattened_preset(preset_name: str) -> PresetParams:
+    presets, _ = read_presets()
+
+    return _flatten_preset(preset_name, presets)
+
+
+def clear_presets_cache() -> None:
+    """Clears the cached presets so that the preset files are re-read on next use."""
+    with _cache_lock:
+        _read_presets.cache_clear()
+        _flattened_preset.cache_clear()
+
+
+def refresh_presets() -> bool:
+    """Clears the cached presets if any preset file was created, modified, or deleted since it was read.
+    A file counts as modified if its modification time or size changed, so this only stats the files.
+    Returns True if the cache was cleared.
+    """
+    with _cache_lock:
+        if any(_file_stats(file_path) != stats for file_path, stats in _read_stats.items()):
+            clear_presets_cache()
+            return True
+
+    return False
+
+
+def _file_stats(file_path: Path) -> tuple[float, int] | None:
+    try:
+        stat_result = file_path.stat()
+    except FileNotFoundError:
+        return None
+
+    return stat_result.st_mtime, stat_result.st_size
+
+
+def _flatten_preset(preset_name: str, presets: ParamPresets) -> PresetParams:
+    if preset_name not in presets:
+        msg = f"Unknown preset '{preset_name}'."
+        raise ValueError(msg)
+
+    params: PresetParams = {}
+    for name in _resolve_preset(preset_name, presets, set()):
+        preset = presets[name]
+        params |= {param_label: str(value) for param_label, value in preset.items() if param_label != "bases"}
+
+    return params
+
+
+def _resolve_preset(preset_name: str, presets: ParamPresets, seen: set[str]) -> list[str]:
+    """Returns the names of the preset and its ancestors in the order they're applied.
+    Bases come before the presets that inherit from them, in the order they're written.
+    Each name appears once, so an ancestor shared by several bases is only applied before the first of them.
+    """
+    if preset_name in seen:
+        return []
+
+    seen.add(preset_name)
+
+    order: list[str] = []
+    for base in cast(Bases, presets[preset_name].get("bases", [])):
+        if base not in presets:
+            msg = f"Preset '{preset_name}' has an unknown base '{base}'."
+            raise ValueError(msg)
+
+        order += _resolve_preset(base, presets, seen)
+
+    order.append(preset_name)
+
+    return order
+
+
 def _read_preset(file_path: Path) -> tuple[ParamPresets, Constants]:
+    _read_stats[file_path] = _file_stats(file_path)
+
     try:
         with Path.open(file_path, "rb") as file:
             presets = tomllib.load(file)
@@ -1,55 +1,144 @@
-"""Contains a function to safely evaluate input expressions."""
+"""Contains a class and a function to safely evaluate input expressions."""
+import ast
+from contextlib import suppress
+from functools import lru_cache
+from math import isfinite
+from types import CodeType
+
 from src.lagrangepointgui.presets import read_presets
 from src.lagrangepointsimulator.constants import CONSTANTS
 
-ALLOWED_CHARS = set("0123456789.+-*/()e")
+# the only syntax allowed in an expression is arithmetic on numbers and names
+ALLOWED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Pow,
+    ast.USub,
+    ast.UAdd,
+)
+
+
+@lru_cache(maxsize=1)
+def _get_eval_globals() -> dict[str, object]:
+    """Returns the namespace expressions are evaluated in, the developer defined constants merged with the user
+    defined ones and no builtins.
+    The result is cached so the preset files aren't re-read on every evaluation. Expressions can't assign names,
+    so the namespace is passed to eval as is rather than copied.
+    """
+    _, user_constants = read_presets()
 
+    eval_globals: dict[str, object] = {"__builtins__": {}, **CONSTANTS, **user_constants}
 
-def safe_eval(expr: str) -> int | float | None:
-    """safe eval function used on expressions that contain developer and user defined constants.
-    Returns the result of the expression as a float or int. If the expression is empty, returns None.
-    Raises a ValueError if the expression contains anything other than
-    the constants, digits, the usual arithmetic operators, parens, or scientific notation.
+    return eval_globals
+
+
+def invalidate_constants() -> None:
+    """Clears the cached constants. Must be called after the presets have been re-read."""
+    _get_eval_globals.cache_clear()
+
+
+class ExpressionEvaluator:
+    """Safely evaluates expressions that contain developer and user defined constants.
+    The compiled code of each distinct expression is kept, so an expression is only parsed and compiled once.
+    Results are kept as well, along with the constants they were evaluated with, and reused while those constants
+    remain current.
     """
 
-    if not expr:
-        return None
+    def __init__(self) -> None:
+        self._code_cache: dict[str, CodeType] = {}
+        self._result_cache: dict[str, tuple[dict[str, object], int | float]] = {}
 
-    expr = expr.strip()
+    def parse(self, expr: str) -> CodeType:
+        """Returns the compiled code of the expression.
+        Raises a ValueError if the expression contains anything other than arithmetic on numbers and names.
+        """
+        code = self._code_cache.get(expr)
+        if code is None:
+            code = self._code_cache[expr] = _compile(expr)
 
-    _, user_constants = read_presets()
+        return code
+
+    def evaluate(self, expr: str) -> int | float | None:
+        """Returns the result of the expression as a float or int. If the expression is empty, returns None.
+        Raises a ValueError if the expression contains anything other than
+        arithmetic on numbers and the constants.
+        """
+        if not expr:
+            return None
+
+        expr = expr.strip()
 
-    all_constants = CONSTANTS | user_constants
+        # most fields contain plain numbers which don't need the constants or eval
+        if (number := _parse_number(expr)) is not None:
+            return number
 
-    _validate_expr(expr, all_constants)
+        eval_globals = _get_eval_globals()
 
-    try:
-        res = eval(expr, all_constants)
-    except (NameError, SyntaxError, ZeroDivisionError) as err:
-        raise ValueError(str(err)) from err
+        # the cached namespace is replaced by a new dict when the constants are invalidated
+        cached = self._result_cache.get(expr)
+        if cached is not None and cached[0] is eval_globals:
+            return cached[1]
 
-    if not isinstance(res, int | float):
-        msg = "Result is not a real number."
-        raise TypeError(msg)
+        try:
+            code = self.parse(expr)
+            res = eval(code, eval_globals)
+        except (NameError, SyntaxError, ZeroDivisionError) as err:
+            raise ValueError(str(err)) from err
 
-    return res
+        if not isinstance(res, int | float):
+            msg = "Result is not a real number."
+            raise TypeError(msg)
 
+        self._result_cache[expr] = (eval_globals, res)
 
-def _validate_expr(expr: str, constants: dict[str, float | int]) -> None:
-    """Ensures that the expression only contains constants, digits,
-    the usual arithmetic operators, parens, or scientific notation.
+        return res
+
+
+_evaluator = ExpressionEvaluator()
+
+
+def safe_eval(expr: str) -> int | float | None:
+    """safe eval function used on expressions that contain developer and user defined constants.
+    Returns the result of the expression as a float or int. If the expression is empty, returns None.
+    Raises a ValueError if the expression contains anything other than
+    arithmetic on numbers and the constants.
     """
-    cleaned_expr = _remove_constants(expr, constants)
-    chars_in_expr = set(cleaned_expr)
-    if not chars_in_expr.issubset(ALLOWED_CHARS):
-        msg = "invalid constant or syntax in expression."
-        raise ValueError(msg)
 
+    return _evaluator.evaluate(expr)
+
+
+def _parse_number(expr: str) -> int | float | None:
+    """Returns the expression as an int or finite float if it is a plain number, otherwise returns None."""
+    with suppress(ValueError):
+        return int(expr)
+
+    with suppress(ValueError):
+        number = float(expr)
+        if isfinite(number):
+            return number
 
-def _remove_constants(expr: str, constants: dict[str, float | int]) -> str:
-    """remove constants in the expression"""
+    return None
+
+
+def _compile(expr: str) -> CodeType:
+    """Parses and compiles the expression.
+    Raises a ValueError if the expression contains anything other than arithmetic on numbers and names.
+    """
+    tree = ast.parse(expr, mode="eval")
 
-    for constant_name in constants:
-        expr = expr.replace(constant_name, "")
+    for node in ast.walk(tree):
+        is_non_numeric_constant = isinstance(node, ast.Constant) and type(node.value) not in (int, float)
+        if not isinstance(node, ALLOWED_NODES) or is_non_numeric_constant:
+            msg = "invalid constant or syntax in expression."
+            raise ValueError(msg)
 
-    return expr
+    return compile(tree, "<safe_eval>", "eval")
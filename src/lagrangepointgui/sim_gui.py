@@ -1,9 +1,17 @@
 # ruff: noqa: N802 N803 N806 N812
-import sys
-from collections.abc import Callable
-from typing import TypeAlias, cast
+from __future__ import annotations
 
-from PyQt6.QtCore import QObject, QRunnable, Qt, QThreadPool, pyqtSignal
+import re
+import sys
+import threading
+from collections.abc import Callable, Generator, Iterable
+from concurrent.futures import Executor, Future
+from contextlib import ExitStack, contextmanager
+from functools import partial
+from types import MappingProxyType
+from typing import TYPE_CHECKING, ParamSpec, TypeAlias, TypeVar
+
+from PyQt6.QtCore import QObject, QSignalBlocker, Qt, QThreadPool, QTimer, pyqtSignal
 from PyQt6.QtGui import QFont
 from PyQt6.QtWidgets import (
     QApplication,
@@ -20,10 +28,17 @@ from PyQt6.QtWidgets import (
     QWidget,
 )
 
-from src.lagrangepointgui.orbit_plotter import Plotter
+from src.lagrangepointgui.presets import flattened_preset as flattenedPreset
+from src.lagrangepointgui.presets import preload_presets as preloadPresets
 from src.lagrangepointgui.presets import read_presets as readPresets
-from src.lagrangepointgui.safe_eval import safe_eval as safeEval
-from src.lagrangepointsimulator import Simulator
+from src.lagrangepointgui.presets import refresh_presets as refreshPresets
+from src.lagrangepointgui.safe_eval import ExpressionEvaluator
+from src.lagrangepointgui.safe_eval import invalidate_constants as invalidateConstants
+
+# the plotter and simulator load pyqtgraph and numba, so they're imported in main() to keep importing this module cheap
+if TYPE_CHECKING:
+    from src.lagrangepointgui.orbit_plotter import Plotter
+    from src.lagrangepointsimulator import Simulator
 
 LAGRANGE_LABEL = "Lagrange label"
 
@@ -67,9 +82,15 @@ class _SimUi(QMainWindow):
         self._plotter = plotter
         self._plotted = False
         self.inputFields: dict[str, QLineEdit] = {}
+        # (parameter label, attribute name in Simulator, input field) for each parameter
+        self._fieldBindings: list[tuple[str, str, QLineEdit]] = []
+        # labels of the fields whose text changed since their values were last applied to the Simulator
+        self._dirtyFields: set[str] = set()
+        self._evaluator = ExpressionEvaluator()
         self.presetBox = QComboBox()
         self.buttons: dict[str, QPushButton] = {}
         self.autoPlotConserved = QCheckBox("Auto Plot Conserved")
+        self._errorDialog = _createErrorDialog(self)
 
         self.setWindowTitle("Orbits near Lagrange Points")
 
@@ -131,13 +152,13 @@ class _SimUi(QMainWindow):
         argLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self._inputsLayout.addRow(argLabel)
 
-        for fieldLabel, (defaultValue, _) in params.items():
+        for fieldLabel, (defaultValue, attributeName) in params.items():
             field = QLineEdit(defaultValue)
-            self.inputFields[fieldLabel] = field
+            self._bindField(fieldLabel, attributeName, field)
             self._inputsLayout.addRow(fieldLabel, field)
 
     def _addLagrangeLabel(self) -> None:
-        defaultValue = LAGRANGE_PARAM[LAGRANGE_LABEL][0]
+        defaultValue, attributeName = LAGRANGE_PARAM[LAGRANGE_LABEL]
         field = QLineEdit()
         field.setReadOnly(True)
 
@@ -146,16 +167,33 @@ class _SimUi(QMainWindow):
         box.setCurrentText(defaultValue)
         box.setLineEdit(field)
 
-        self.inputFields[LAGRANGE_LABEL] = field
+        self._bindField(LAGRANGE_LABEL, attributeName, field)
         self._inputsLayout.addRow(LAGRANGE_LABEL, box)
 
+    def _bindField(self, fieldLabel: str, attributeName: str, field: QLineEdit) -> None:
+        self.inputFields[fieldLabel] = field
+        self._fieldBindings.append((fieldLabel, attributeName, field))
+        # every field starts dirty so that its value is applied on the first simulation
+        self._dirtyFields.add(fieldLabel)
+        # noinspection PyUnresolvedReferences
+        field.textChanged.connect(lambda _: self._dirtyFields.add(fieldLabel))
+
+    def markFieldsDirty(self, fieldLabels: Iterable[str]) -> None:
+        self._dirtyFields.update(fieldLabels)
+
+    def markAllFieldsDirty(self) -> None:
+        self.markFieldsDirty(self.inputFields)
+
+    def clearDirtyFields(self) -> None:
+        self._dirtyFields.clear()
+
     def updateOrbitPlots(self) -> None:
         self._plotted = True
         self._plotter.plot_orbit_inertial_and_corotating()
 
     def toggleAnimation(self) -> None:
         if not self._plotted:
-            _displayErrorMessage("No plots to animate.")
+            self.displayErrorMessage("No plots to animate.")
             return
 
         self._plotter.toggle_animation()
@@ -163,62 +201,111 @@ class _SimUi(QMainWindow):
     def stopAnimation(self) -> None:
         self._plotter.stop_animation()
 
-    def calcConservedQuantities(self) -> None:
-        self._plotter.get_conserved_quantities()
+    def calcConservedQuantities(self, executor: Executor | None = None) -> None:
+        self._plotter.get_conserved_quantities(executor)
 
     def plotConservedQuantities(self) -> None:
         if not self._plotted:
-            _displayErrorMessage("No data to plot.")
+            self.displayErrorMessage("No data to plot.")
             return
 
         self._plotter.plot_conserved_quantities()
 
+    def displayErrorMessage(self, message: str) -> None:
+        """Display an error message in a dialog box.
+        The dialog is modal but shown without a nested event loop, messages sent while it's open are queued."""
+        self._errorDialog.showMessage(message)
+
     def getInputs(self) -> dict[str, Input]:
-        """Get the parameters from the input fields. Returns a dict of parameter label to value.
+        """Get the parameters from the input fields that changed since clearDirtyFields was last called.
+        Returns a dict of Simulator attribute name to value.
         Raises a ValueError if any of the numerical fields can't be evaluated."""
         inputs: dict[str, Input] = {}
-        for fieldLabel, field in self.inputFields.items():
+        for fieldLabel, attributeName, field in self._fieldBindings:
+            if fieldLabel not in self._dirtyFields:
+                continue
+
             fieldText = field.text()
 
             if fieldLabel == LAGRANGE_LABEL:
-                inputs[fieldLabel] = fieldText
+                inputs[attributeName] = fieldText
                 continue
 
             try:
-                value = safeEval(fieldText)
+                value = self._evaluator.evaluate(fieldText)
             except (ValueError, TypeError) as e:
                 msg = f"Invalid expression in field '{fieldLabel}'.\n{e}"
                 raise ValueError(msg) from e
 
-            inputs[fieldLabel] = value
+            inputs[attributeName] = value
 
         return inputs
 
 
-ALL_PARAMS = SIMULATION_PARAMS | SATELLITE_PARAMS | LAGRANGE_PARAM | SYSTEM_PARAMS
+ALL_PARAMS = MappingProxyType(SIMULATION_PARAMS | SATELLITE_PARAMS | LAGRANGE_PARAM | SYSTEM_PARAMS)
+
+# (param label used in gui, attribute name in simulator class) for every parameter
+PARAM_LABEL_ATTRIBUTE_NAME_PAIRS: tuple[tuple[str, str], ...] = tuple(
+    (paramLabel, attribute) for paramLabel, (_, attribute) in ALL_PARAMS.items()
+)
 
 # used to translate param labels used in gui to attribute names in simulator class
-PARAM_LABEL_TO_ATTRIBUTE_NAME = {paramLabel: attribute for paramLabel, (_, attribute) in ALL_PARAMS.items()}
+PARAM_LABEL_TO_ATTRIBUTE_NAME = MappingProxyType(dict(PARAM_LABEL_ATTRIBUTE_NAME_PAIRS))
+
+# used to replace attribute names in error messages with the param labels used in gui
+ATTRIBUTE_NAME_TO_PARAM_LABEL = MappingProxyType(
+    {attribute: paramLabel for paramLabel, attribute in PARAM_LABEL_ATTRIBUTE_NAME_PAIRS},
+)
+
+# longer names come first so that an attribute name isn't partially matched by a shorter one
+ATTRIBUTE_NAME_PATTERN = re.compile(
+    r"\b(" + "|".join(map(re.escape, sorted(ATTRIBUTE_NAME_TO_PARAM_LABEL, key=len, reverse=True))) + r")\b",
+)
+
 
+def _replaceAttributeNames(msg: str) -> str:
+    """Replaces the Simulator attribute names in msg with the corresponding param labels."""
+    return ATTRIBUTE_NAME_PATTERN.sub(lambda match: ATTRIBUTE_NAME_TO_PARAM_LABEL[match.group(0)], msg)
 
-def _translateInputs(inputs: dict[str, Input]) -> dict[str, Input]:
-    return {PARAM_LABEL_TO_ATTRIBUTE_NAME[label]: v for label, v in inputs.items()}
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+OnFinishFuncs: TypeAlias = list[Callable[[], None]]
 
 
 class WorkerSignals(QObject):
-    finished = pyqtSignal()
+    # emitted with (future, on finish funcs) when an expensive function is done
+    finished = pyqtSignal(object)
 
 
-class ExpensiveFuncRunner(QRunnable):
-    def __init__(self, expensiveFunc: Callable[[], None]) -> None:
-        super().__init__()
-        self.expensiveFunc = expensiveFunc
-        self.signals = WorkerSignals()
+class QThreadPoolExecutor(Executor):
+    """Executor which runs the submitted functions on the global QThreadPool."""
 
-    def run(self) -> None:
-        self.expensiveFunc()
-        # noinspection PyUnresolvedReferences
-        self.signals.finished.emit()
+    def __init__(self) -> None:
+        if not (pool := QThreadPool.globalInstance()):
+            msg = "Unable to find thread pool."
+            raise RuntimeError(msg)
+
+        self._pool = pool
+
+    def submit(self, fn: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs) -> Future[T]:
+        future: Future[T] = Future()
+
+        def run() -> None:
+            if not future.set_running_or_notify_cancel():
+                return
+
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:  # noqa: BLE001
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        self._pool.start(run)
+
+        return future
 
 
 class _SimCtrl:
@@ -227,38 +314,56 @@ class _SimCtrl:
         self._view = view
         self._connectSignals()
         self._addReturnPressed()
-        self._calculating = False
+        # set while an expensive function is running
+        self._calculating = threading.Event()
+        # True while a simulation is scheduled but hasn't started
+        self._simulatePending = False
+        # the buttons start out enabled
+        self._enabledButtons = frozenset(self._view.buttons)
+        self._executor = QThreadPoolExecutor()
+        self._signals = WorkerSignals()
+        # noinspection PyUnresolvedReferences
+        self._signals.finished.connect(self._onExpensiveFuncFinished)
 
     # noinspection PyUnresolvedReferences
     def _connectSignals(self) -> None:
-        btnActions = {
-            SIMULATE: self._simulate,
-            TOGGLE_ANIMATION: self._toggleAnimation,
-            PLOT_CONSERVED: self._plotConservedQuantities,
-        }
-        for btnText, btn in self._view.buttons.items():
-            action = btnActions[btnText]
-            btn.clicked.connect(action)
+        btnActions = (
+            (SIMULATE, self._simulate),
+            (TOGGLE_ANIMATION, self._toggleAnimation),
+            (PLOT_CONSERVED, self._plotConservedQuantities),
+        )
+        for btnText, action in btnActions:
+            self._view.buttons[btnText].clicked.connect(action)
 
         self._view.presetBox.activated.connect(self._applySelectedPreset)
 
     def _applySelectedPreset(self) -> None:
+        self._refreshPresets()
+
         presetName = self._view.presetBox.currentText()
         self._applyPreset(presetName)
 
     def _applyPreset(self, presetName: str) -> None:
-        presets, _ = readPresets()
-        preset = presets[presetName]
-        bases = cast(list[str], preset.get("bases", []))
-        for base in bases:
-            self._applyPreset(base)
+        try:
+            preset = flattenedPreset(presetName)
 
-        for paramLabel, value in preset.items():
-            if paramLabel == "bases":
-                continue
+        except ValueError as e:
+            self._view.displayErrorMessage(str(e))
+            return
+
+        with _postponedUpdates(self._view, self._view.inputFields.values()):
+            for paramLabel, value in preset.items():
+                self._view.inputFields[paramLabel].setText(value)
 
-            field = self._view.inputFields[paramLabel]
-            field.setText(str(value))
+        # textChanged was blocked so the fields have to be marked dirty explicitly
+        self._view.markFieldsDirty(preset)
+
+    def _refreshPresets(self) -> None:
+        """Picks up edits made to the preset files while the app is running."""
+        if refreshPresets():
+            invalidateConstants()
+            # the values of unchanged fields may depend on constants which were redefined
+            self._view.markAllFieldsDirty()
 
     def _addReturnPressed(self) -> None:
         for field in self._view.inputFields.values():
@@ -268,31 +373,40 @@ class _SimCtrl:
         self._view.presetBox.lineEdit().returnPressed.connect(self._simulate)  # type: ignore
 
     def _simulate(self) -> None:
-        if self._calculating:
+        """Schedules a simulation once control returns to the event loop.
+        Requests made before it starts, e.g. by a button click and a return press, are coalesced into one.
+        """
+        if self._simulatePending:
+            return
+
+        self._simulatePending = True
+        QTimer.singleShot(0, self._doSimulate)
+
+    def _doSimulate(self) -> None:
+        self._simulatePending = False
+
+        if self._calculating.is_set():
             return
 
+        # the fields may use user defined constants which were changed since the last simulation
+        self._refreshPresets()
+
         try:
-            paramLabelToValue = self._view.getInputs()
+            attributeNameToValue = self._view.getInputs()
 
         except ValueError as e:
-            _displayErrorMessage(str(e))
+            self._view.displayErrorMessage(str(e))
             return
 
-        attributeNameToValue = _translateInputs(paramLabelToValue)
-
         try:
-            for attributeName, value in attributeNameToValue.items():
-                setattr(self._model, attributeName, value)
+            self._model.apply_params(**attributeNameToValue)
 
         except (TypeError, ValueError) as e:
-            msg = str(e)
-            # replace attribute names with parameter labels
-            for paramLabel, attributeName in PARAM_LABEL_TO_ATTRIBUTE_NAME.items():
-                msg = msg.replace(attributeName, paramLabel)
-
-            _displayErrorMessage(msg)
+            self._view.displayErrorMessage(_replaceAttributeNames(str(e)))
             return
 
+        self._view.clearDirtyFields()
+
         self._view.stopAnimation()
         onFinishFuncs = [self._view.updateOrbitPlots]
         if self._view.autoPlotConserved.isChecked():
@@ -302,55 +416,93 @@ class _SimCtrl:
         self._runInThread(self._model.simulate, onFinishFuncs)
 
     def _enableButtons(self) -> None:
-        for btn in self._view.buttons.values():
-            btn.setEnabled(True)
+        self._setEnabledButtons(frozenset(self._view.buttons))
 
     def _disableButtons(self) -> None:
-        for btn in self._view.buttons.values():
-            btn.setEnabled(False)
+        self._setEnabledButtons(frozenset())
 
     def _disableButtonsExceptToggleAnimation(self) -> None:
-        for btnText, btn in self._view.buttons.items():
-            if btnText == TOGGLE_ANIMATION:
-                continue
+        self._setEnabledButtons(frozenset((TOGGLE_ANIMATION,)))
+
+    def _setEnabledButtons(self, enabledButtons: frozenset[str]) -> None:
+        """Enables the buttons whose text is in enabledButtons and disables the rest.
+        Does nothing if the buttons are already in that state.
+        """
+        if enabledButtons == self._enabledButtons:
+            return
 
-            btn.setEnabled(False)
+        self._enabledButtons = enabledButtons
+        for btnText, btn in self._view.buttons.items():
+            btn.setEnabled(btnText in enabledButtons)
 
     def _toggleAnimation(self) -> None:
         self._view.toggleAnimation()
 
     def _plotConservedQuantities(self) -> None:
         self._disableButtonsExceptToggleAnimation()
-        self._runInThread(self._view.calcConservedQuantities, [self._view.plotConservedQuantities])
+        # the quantities are independent so they're calculated in parallel on the same pool
+        calcConservedQuantities = partial(self._view.calcConservedQuantities, self._executor)
+        self._runInThread(calcConservedQuantities, [self._view.plotConservedQuantities])
 
-    # noinspection PyUnresolvedReferences
-    def _runInThread(self, expensiveFunc: Callable[[], None], onFinishFuncs: list[Callable[[], None]]) -> None:
+    def _runInThread(self, expensiveFunc: Callable[[], None], onFinishFuncs: OnFinishFuncs) -> None:
         """Run an expensive function in a separate thread."""
-        runnable = ExpensiveFuncRunner(expensiveFunc)
+        self._calculating.set()
 
-        runnable.signals.finished.connect(self._enableButtons)
-        runnable.signals.finished.connect(self._setCalculatingFalse)
-        for onFinishFunc in onFinishFuncs:
-            runnable.signals.finished.connect(onFinishFunc)
+        future = self._executor.submit(expensiveFunc)
+        # done callbacks are called in the worker thread so the gui is updated through a signal
+        # noinspection PyUnresolvedReferences
+        future.add_done_callback(lambda _: self._signals.finished.emit((future, onFinishFuncs)))
 
-        if not (pool := QThreadPool.globalInstance()):
-            msg = "Unable to find thread pool."
-            raise RuntimeError(msg)
-        pool.start(runnable)
-        self._calculating = True
+    def _onExpensiveFuncFinished(self, finished: tuple[Future[None], OnFinishFuncs]) -> None:
+        future, onFinishFuncs = finished
+
+        self._enableButtons()
+        self._setCalculatingFalse()
+
+        if (exception := future.exception()) is not None:
+            self._view.displayErrorMessage(str(exception))
+            return
+
+        for onFinishFunc in onFinishFuncs:
+            onFinishFunc()
 
     def _setCalculatingFalse(self) -> None:
-        self._calculating = False
+        self._calculating.clear()
+
+
+@contextmanager
+def _postponedUpdates(window: QWidget, widgets: Iterable[QWidget]) -> Generator[None, None, None]:
+    """Blocks the signals of widgets and disables painting of window for the duration of the context.
+    Changing many widgets then emits no signal per widget and window is repainted once at the end.
+    """
+    window.setUpdatesEnabled(False)
+    try:
+        with ExitStack() as stack:
+            for widget in widgets:
+                stack.enter_context(QSignalBlocker(widget))
 
+            yield
+    finally:
+        window.setUpdatesEnabled(True)
 
-def _displayErrorMessage(message: str) -> None:
-    """Display an error message in a dialog box."""
-    errorMsg = QErrorMessage()
-    errorMsg.showMessage(message)
-    errorMsg.exec()
+
+def _createErrorDialog(window: QWidget) -> QErrorMessage:
+    """Returns the dialog used to display error messages.
+    It's parented to window so that it's centered on and destroyed with it."""
+    errorDialog = QErrorMessage(window)
+    errorDialog.setModal(True)
+
+    return errorDialog
 
 
 def main() -> None:
+    # read the presets in the background while the rest of the gui is imported and constructed
+    # if reading fails the error is raised again when the gui reads them
+    QThreadPoolExecutor().submit(preloadPresets)
+
+    from src.lagrangepointgui.orbit_plotter import Plotter
+    from src.lagrangepointsimulator import Simulator
+
     simApp = QApplication(sys.argv)
     simApp.setFont(QFont("Arial", 13))
     simApp.setStyle("fusion")
@@ -1,2 +1,17 @@
+from typing import TYPE_CHECKING
+
 from src.lagrangepointsimulator import constants, sim_types
-from src.lagrangepointsimulator.simulator import Simulator
+
+if TYPE_CHECKING:
+    from src.lagrangepointsimulator.simulator import Simulator
+
+
+def __getattr__(name: str) -> object:
+    # Simulator is imported on first access since importing it loads numba
+    if name == "Simulator":
+        from src.lagrangepointsimulator.simulator import Simulator
+
+        return Simulator
+
+    msg = f"module {__name__!r} has no attribute {name!r}"
+    raise AttributeError(msg)
@@ -1,3 +1,5 @@
+from types import MappingProxyType
+
 # universal gravitational constant in meters^3*1/kilograms*1/seconds^2
 G = 6.67430 * 10**-11
 
@@ -13,11 +15,14 @@ EARTH_MASS = 5.9722 * 10**24
 # 1 AU in meters
 AU = 1.495978707 * 10**11
 
-CONSTANTS: dict[str, float | int] = {
-    "G": G,
-    "AU": AU,
-    "years": YEARS,
-    "hours": HOURS,
-    "sun_mass": SUN_MASS,
-    "earth_mass": EARTH_MASS,
-}
+# read-only so that it can be shared by every evaluation namespace
+CONSTANTS: MappingProxyType[str, float | int] = MappingProxyType(
+    {
+        "G": G,
+        "AU": AU,
+        "years": YEARS,
+        "hours": HOURS,
+        "sun_mass": SUN_MASS,
+        "earth_mass": EARTH_MASS,
+    },
+)
@@ -7,72 +7,61 @@ from src.lagrangepointsimulator.constants import G
 from src.lagrangepointsimulator.sim_types import Array1D, Array2D
 
 
-@njit()
-def inverse_norm_cubed(vector: Array1D) -> float:
-    return sqrt(vector[0] * vector[0] + vector[1] * vector[1] + vector[2] * vector[2]) ** -3
-
-
-@njit()
-def calc_acceleration(
-    g_star: float,
-    g_planet: float,
-    star_pos: Array1D,
-    planet_pos: Array1D,
-    sat_pos: Array1D,
-    star_accel: Array1D,
-    planet_accel: Array1D,
-    sat_accel: Array1D,
-    planet_to_star: Array1D,
-    sat_to_star: Array1D,
-    sat_to_planet: Array1D,
-) -> None:
-    for j in range(3):
-        planet_to_star[j] = star_pos[j] - planet_pos[j]
-        sat_to_star[j] = star_pos[j] - sat_pos[j]
-        sat_to_planet[j] = planet_pos[j] - sat_pos[j]
-
-    d_planet_to_star_inverse_cubed = inverse_norm_cubed(planet_to_star)
-    d_sat_to_star_inverse_cubed = inverse_norm_cubed(sat_to_star)
-    d_sat_to_planet_inverse_cubed = inverse_norm_cubed(sat_to_planet)
-
-    star_planet_coeff = g_planet * d_planet_to_star_inverse_cubed
-    planet_star_coeff = g_star * d_planet_to_star_inverse_cubed
-    sat_star_coeff = g_star * d_sat_to_star_inverse_cubed
-    sat_planet_coeff = g_planet * d_sat_to_planet_inverse_cubed
-
-    for j in range(3):
-        star_accel[j] = -star_planet_coeff * planet_to_star[j]
-
-        # note the lack of negative signs in the following lines
-        planet_accel[j] = planet_star_coeff * planet_to_star[j]
-
-        sat_accel[j] = sat_star_coeff * sat_to_star[j] + sat_planet_coeff * sat_to_planet[j]
-
-
-@njit(cache=True)
+# inlined into the caller's IR so that the whole step of the integrator is optimized as one block
+@njit(fastmath=True, error_model="numpy", inline="always")
+def inverse_norm_cubed(x: float, y: float, z: float) -> float:
+    norm_squared = x * x + y * y + z * z
+    return 1.0 / (norm_squared * sqrt(norm_squared))
+
+
+@njit(fastmath=True, error_model="numpy", inline="always")
+def drift(
+    x: float,
+    y: float,
+    z: float,
+    vx: float,
+    vy: float,
+    vz: float,
+    time_step: float,
+) -> tuple[float, float, float]:
+    """Returns the position reached from (x, y, z) by moving at the velocity (vx, vy, vz) for time_step."""
+    return x + vx * time_step, y + vy * time_step, z + vz * time_step
+
+
+# each row of the state array holds the positions and velocities of the bodies at one time point
+# these are the columns at which each 3-vector starts
+STAR_POS = 0
+STAR_VEL = 3
+PLANET_POS = 6
+PLANET_VEL = 9
+SAT_POS = 12
+SAT_VEL = 15
+STATE_SIZE = 18
+
+
+# fastmath lets LLVM reorder and fuse the floating point operations, so results differ from strict IEEE evaluation
+# in the last bits, far below the integration error of the method
+# the signatures are given explicitly so that each function is compiled for exactly the array layouts it's called with
+# the state array is C-contiguous while positions passed to transform_to_corotating are strided views into it
+@njit("void(f8, i8, f8, f8, f8[:, ::1])", cache=True, fastmath=True, boundscheck=False, error_model="numpy")
 def integrate(
     time_step: float,
     num_steps: int,
     star_mass: float,
     planet_mass: float,
-    star_pos: Array2D,
-    star_vel: Array2D,
-    planet_pos: Array2D,
-    planet_vel: Array2D,
-    sat_pos: Array2D,
-    sat_vel: Array2D,
+    state: Array2D,
 ) -> None:
-    star_accel = np.empty(3, dtype=np.double)
-    planet_accel = np.empty_like(star_accel)
-    sat_accel = np.empty_like(star_accel)
+    """Integrates the initial state in row 0 of state, writing the state after step k into row k."""
+    # the state of the system is carried between steps in scalar locals
+    # so that each step only reads from and writes to the array once
+    star_x, star_y, star_z = state[0, STAR_POS], state[0, STAR_POS + 1], state[0, STAR_POS + 2]
+    star_vx, star_vy, star_vz = state[0, STAR_VEL], state[0, STAR_VEL + 1], state[0, STAR_VEL + 2]
 
-    star_intermediate_pos = np.empty_like(star_accel)
-    planet_intermediate_pos = np.empty_like(star_accel)
-    sat_intermediate_pos = np.empty_like(star_accel)
+    planet_x, planet_y, planet_z = state[0, PLANET_POS], state[0, PLANET_POS + 1], state[0, PLANET_POS + 2]
+    planet_vx, planet_vy, planet_vz = state[0, PLANET_VEL], state[0, PLANET_VEL + 1], state[0, PLANET_VEL + 2]
 
-    planet_to_star = np.empty_like(star_accel)
-    sat_to_star = np.empty_like(star_accel)
-    sat_to_planet = np.empty_like(star_accel)
+    sat_x, sat_y, sat_z = state[0, SAT_POS], state[0, SAT_POS + 1], state[0, SAT_POS + 2]
+    sat_vx, sat_vy, sat_vz = state[0, SAT_VEL], state[0, SAT_VEL + 1], state[0, SAT_VEL + 2]
 
     half_time_step = 0.5 * time_step
 
@@ -80,70 +69,186 @@ def integrate(
     g_planet = G * planet_mass
 
     for k in range(1, num_steps + 1):
-        for j in range(3):
-            star_intermediate_pos[j] = star_pos[k - 1, j] + star_vel[k - 1, j] * half_time_step
-
-            planet_intermediate_pos[j] = planet_pos[k - 1, j] + planet_vel[k - 1, j] * half_time_step
-
-            sat_intermediate_pos[j] = sat_pos[k - 1, j] + sat_vel[k - 1, j] * half_time_step
-
-        calc_acceleration(
-            g_star,
-            g_planet,
-            star_intermediate_pos,
-            planet_intermediate_pos,
-            sat_intermediate_pos,
-            star_accel,
-            planet_accel,
-            sat_accel,
-            planet_to_star,
-            sat_to_star,
-            sat_to_planet,
+        # intermediate positions
+        star_x, star_y, star_z = drift(star_x, star_y, star_z, star_vx, star_vy, star_vz, half_time_step)
+        planet_x, planet_y, planet_z = drift(
+            planet_x, planet_y, planet_z, planet_vx, planet_vy, planet_vz, half_time_step
+        )
+        sat_x, sat_y, sat_z = drift(sat_x, sat_y, sat_z, sat_vx, sat_vy, sat_vz, half_time_step)
+
+        # accelerations at the intermediate positions
+        planet_to_star_x = star_x - planet_x
+        planet_to_star_y = star_y - planet_y
+        planet_to_star_z = star_z - planet_z
+
+        sat_to_star_x = star_x - sat_x
+        sat_to_star_y = star_y - sat_y
+        sat_to_star_z = star_z - sat_z
+
+        sat_to_planet_x = planet_x - sat_x
+        sat_to_planet_y = planet_y - sat_y
+        sat_to_planet_z = planet_z - sat_z
+
+        d_planet_to_star_inverse_cubed = inverse_norm_cubed(planet_to_star_x, planet_to_star_y, planet_to_star_z)
+        d_sat_to_star_inverse_cubed = inverse_norm_cubed(sat_to_star_x, sat_to_star_y, sat_to_star_z)
+        d_sat_to_planet_inverse_cubed = inverse_norm_cubed(sat_to_planet_x, sat_to_planet_y, sat_to_planet_z)
+
+        star_planet_coeff = g_planet * d_planet_to_star_inverse_cubed
+        planet_star_coeff = g_star * d_planet_to_star_inverse_cubed
+        sat_star_coeff = g_star * d_sat_to_star_inverse_cubed
+        sat_planet_coeff = g_planet * d_sat_to_planet_inverse_cubed
+
+        star_vx -= star_planet_coeff * planet_to_star_x * time_step
+        star_vy -= star_planet_coeff * planet_to_star_y * time_step
+        star_vz -= star_planet_coeff * planet_to_star_z * time_step
+
+        # note the lack of negative signs in the following lines
+        planet_vx += planet_star_coeff * planet_to_star_x * time_step
+        planet_vy += planet_star_coeff * planet_to_star_y * time_step
+        planet_vz += planet_star_coeff * planet_to_star_z * time_step
+
+        sat_vx += (sat_star_coeff * sat_to_star_x + sat_planet_coeff * sat_to_planet_x) * time_step
+        sat_vy += (sat_star_coeff * sat_to_star_y + sat_planet_coeff * sat_to_planet_y) * time_step
+        sat_vz += (sat_star_coeff * sat_to_star_z + sat_planet_coeff * sat_to_planet_z) * time_step
+
+        # positions at the end of the step
+        star_x, star_y, star_z = drift(star_x, star_y, star_z, star_vx, star_vy, star_vz, half_time_step)
+        planet_x, planet_y, planet_z = drift(
+            planet_x, planet_y, planet_z, planet_vx, planet_vy, planet_vz, half_time_step
         )
+        sat_x, sat_y, sat_z = drift(sat_x, sat_y, sat_z, sat_vx, sat_vy, sat_vz, half_time_step)
 
-        for j in range(3):
-            star_vel[k, j] = star_vel[k - 1, j] + star_accel[j] * time_step
+        row = state[k]
 
-            planet_vel[k, j] = planet_vel[k - 1, j] + planet_accel[j] * time_step
+        row[STAR_POS], row[STAR_POS + 1], row[STAR_POS + 2] = star_x, star_y, star_z
+        row[STAR_VEL], row[STAR_VEL + 1], row[STAR_VEL + 2] = star_vx, star_vy, star_vz
 
-            sat_vel[k, j] = sat_vel[k - 1, j] + sat_accel[j] * time_step
+        row[PLANET_POS], row[PLANET_POS + 1], row[PLANET_POS + 2] = planet_x, planet_y, planet_z
+        row[PLANET_VEL], row[PLANET_VEL + 1], row[PLANET_VEL + 2] = planet_vx, planet_vy, planet_vz
 
-            star_pos[k, j] = star_intermediate_pos[j] + star_vel[k, j] * half_time_step
+        row[SAT_POS], row[SAT_POS + 1], row[SAT_POS + 2] = sat_x, sat_y, sat_z
+        row[SAT_VEL], row[SAT_VEL + 1], row[SAT_VEL + 2] = sat_vx, sat_vy, sat_vz
 
-            planet_pos[k, j] = planet_intermediate_pos[j] + planet_vel[k, j] * half_time_step
 
-            sat_pos[k, j] = sat_intermediate_pos[j] + sat_vel[k, j] * half_time_step
+@njit(fastmath=True, inline="always")
+def rotate_position(
+    position: Array2D,
+    cos_angles: Array1D,
+    sin_angles: Array1D,
+    corotating_position: Array2D,
+    i: int,
+) -> None:
+    cos = cos_angles[i]
+    sin = sin_angles[i]
 
+    x = position[i, 0]
+    y = position[i, 1]
 
-@njit(parallel=True, cache=True)
-def transform_to_corotating(position: Array2D, times: Array1D, angular_speed: float) -> Array2D:
-    """Transforms pos_trans to a frame of reference that rotates at a rate of angular_speed counter-clockwise.
-    pos_trans is assumed to be an array of positions measured relative to the center of rotation.
+    corotating_position[i, 0] = cos * x - sin * y
+
+    corotating_position[i, 1] = sin * x + cos * y
+
+
+@njit("f8[:, ::1](f8[:, :], f8[::1], f8[::1])", cache=True, fastmath=True, error_model="numpy")
+def transform_to_corotating(position: Array2D, cos_angles: Array1D, sin_angles: Array1D) -> Array2D:
+    """Rotates each position in position about the z axis by the corresponding angle.
+    The cosines and sines of the angles are passed in since NumPy computes them for whole arrays faster
+    than they can be computed per point.
     """
 
-    # w is the angular speed, t is the time
-    # we transform pos_trans by linearly transforming each position vector by the inverse of the basis transform
-    # the coordinate transform is unit(x) -> R(w*t)*unit(x), unit(y) -> R(w*t)*unit(y)
-    # where R(w*t) is the rotation matrix with angle w*t about the z axis
-    # the inverse is R(-w*t)
-    # at each time t we apply the matrix R(-w*t) to the position vector
+    num_steps = position.shape[0]
+
+    corotating_position = np.empty(dtype=position.dtype, shape=(num_steps, 2))
+
+    # a sequential loop which LLVM can vectorize, the work per point is too small to pay for parallel dispatch
+    for i in range(num_steps):
+        rotate_position(position, cos_angles, sin_angles, corotating_position, i)
+
+    return corotating_position
+
+
+# compiling or calling a parallel kernel starts numba's threading layer, after which forking the process or calling
+# the kernel from a thread other than the main thread can leave the interpreter hanging at exit
+# so unlike the other kernels it has no explicit signature, it's compiled on its first call rather than on import
+@njit(parallel=True, cache=True, fastmath=True, error_model="numpy")
+def transform_to_corotating_parallel(position: Array2D, cos_angles: Array1D, sin_angles: Array1D) -> Array2D:
+    """Parallel version of transform_to_corotating for long simulations which pay for the parallel dispatch."""
 
     num_steps = position.shape[0]
 
     corotating_position = np.empty(dtype=position.dtype, shape=(num_steps, 2))
 
     for i in prange(num_steps):
-        time: float = times[i]
+        rotate_position(position, cos_angles, sin_angles, corotating_position, i)
 
-        angle = -angular_speed * time
+    return corotating_position
 
-        cos: float = np.cos(angle)
-        sin: float = np.sin(angle)
 
-        x, y = position[i, :2]
+@njit(fastmath=True, inline="always")
+def distance(row: Array1D, start_a: int, start_b: int) -> float:
+    """Returns the distance between the 3-vectors starting at columns start_a and start_b of row."""
+    x = row[start_a] - row[start_b]
+    y = row[start_a + 1] - row[start_b + 1]
+    z = row[start_a + 2] - row[start_b + 2]
 
-        corotating_position[i, 0] = cos * x - sin * y
+    return sqrt(x * x + y * y + z * z)
 
-        corotating_position[i, 1] = sin * x + cos * y
 
-    return corotating_position
+@njit(fastmath=True, inline="always")
+def speed_squared(row: Array1D, start: int) -> float:
+    """Returns the squared norm of the 3-vector starting at column start of row."""
+    return row[start] * row[start] + row[start + 1] * row[start + 1] + row[start + 2] * row[start + 2]
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def norms_of_3_vectors(vectors: Array2D) -> Array1D:
+    """Returns the norm of each row of an array of 3-vectors."""
+    num_vectors = vectors.shape[0]
+
+    norms = np.empty(num_vectors, dtype=np.float64)
+
+    for i in range(num_vectors):
+        x = vectors[i, 0]
+        y = vectors[i, 1]
+        z = vectors[i, 2]
+
+        norms[i] = sqrt(x * x + y * y + z * z)
+
+    return norms
+
+
+@njit("f8[::1](f8[:, ::1], f8, f8, f8)", cache=True, nogil=True, fastmath=True, error_model="numpy")
+def total_energy(state: Array2D, star_mass: float, planet_mass: float, sat_mass: float) -> Array1D:
+    """Returns the total energy of the system at each time point of state.
+    Each row is read once and no temporary arrays are created.
+    """
+    num_points = state.shape[0]
+
+    energy = np.empty(num_points, dtype=state.dtype)
+
+    g_star_planet = G * star_mass * planet_mass
+    g_sat_planet = G * sat_mass * planet_mass
+    g_sat_star = G * sat_mass * star_mass
+
+    for i in range(num_points):
+        row = state[i]
+
+        planet_to_star_distance = distance(row, STAR_POS, PLANET_POS)
+        planet_to_sat_distance = distance(row, SAT_POS, PLANET_POS)
+        star_to_sat_distance = distance(row, SAT_POS, STAR_POS)
+
+        potential_energy = -(
+            g_star_planet / planet_to_star_distance
+            + g_sat_planet / planet_to_sat_distance
+            + g_sat_star / star_to_sat_distance
+        )
+
+        kinetic_energy = 0.5 * (
+            star_mass * speed_squared(row, STAR_VEL)
+            + planet_mass * speed_squared(row, PLANET_VEL)
+            + sat_mass * speed_squared(row, SAT_VEL)
+        )
+
+        energy[i] = potential_energy + kinetic_energy
+
+    return energy
@@ -4,24 +4,61 @@ that orbit.
 It ensures that both the star and planet are undergoing uniform circular motion.
 """
 
-from math import ceil, sqrt
-from typing import TypeVar, cast
+import multiprocessing
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from math import ceil, hypot, sqrt
+from typing import TypeVar
 
 import numpy as np
 from numpy.linalg import norm
 
 from src.lagrangepointsimulator import descriptors
 from src.lagrangepointsimulator.constants import AU, EARTH_MASS, HOURS, SUN_MASS, YEARS, G
+from src.lagrangepointsimulator.numba_funcs import (
+    PLANET_POS,
+    PLANET_VEL,
+    SAT_POS,
+    SAT_VEL,
+    STAR_POS,
+    STAR_VEL,
+    STATE_SIZE,
+)
 from src.lagrangepointsimulator.numba_funcs import integrate as nb_integrate
+from src.lagrangepointsimulator.numba_funcs import norms_of_3_vectors as nb_norms_of_3_vectors
+from src.lagrangepointsimulator.numba_funcs import total_energy as nb_total_energy
 from src.lagrangepointsimulator.numba_funcs import transform_to_corotating as nb_transform_to_corotating
+from src.lagrangepointsimulator.numba_funcs import (
+    transform_to_corotating_parallel as nb_transform_to_corotating_parallel,
+)
 from src.lagrangepointsimulator.sim_types import Array1D, Array2D
 
 
 def array_of_norms(arr_2d: Array2D) -> Array1D:
     """Returns an array of the norm of each element of the input array"""
+    # the trajectories are arrays of 3-vectors which the kernel handles without NumPy's general norm machinery
+    if arr_2d.shape[1] == 3:  # noqa: PLR2004
+        return nb_norms_of_3_vectors(arr_2d)
+
     return norm(arr_2d, axis=1)
 
 
+T = TypeVar("T")
+
+
+def _result_or_call(future: Future[T], func: Callable[[], T]) -> T:
+    """Returns the result of future.
+    If the future hasn't started yet it's cancelled and func is called in this thread instead.
+    """
+    return func() if future.cancel() else future.result()
+
+
+PARALLEL_TRANSFORM_MIN_STEPS = 100_000
+
+X_UNIT_VECTOR: Array1D = np.array((1.0, 0.0, 0.0))
+X_UNIT_VECTOR.flags.writeable = False
+
+
 def unit_vector(angle: float) -> Array1D:
     """Takes an angle in radians and returns the corresponding unit vector"""
     return np.array([np.cos(angle), np.sin(angle), 0])
@@ -124,12 +161,32 @@ class Simulator:
 
         self.lagrange_point_trans: Array1D = np.empty(3, dtype=np.double)
 
-        self.star_pos: Array2D = cast(Array2D, np.empty((0, 3), dtype=np.double))
-        self.star_vel: Array2D = np.empty_like(self.star_pos)
-        self.planet_pos: Array2D = np.empty_like(self.star_pos)
-        self.planet_vel: Array2D = np.empty_like(self.star_pos)
-        self.sat_pos: Array2D = np.empty_like(self.star_pos)
-        self.sat_vel: Array2D = np.empty_like(self.star_pos)
+        # row k holds the positions and velocities of all bodies at time point k
+        # the position and velocity arrays of each body are views into it
+        self.state: Array2D = np.empty((0, STATE_SIZE), dtype=np.double)
+        self.star_pos: Array2D
+        self.star_vel: Array2D
+        self.planet_pos: Array2D
+        self.planet_vel: Array2D
+        self.sat_pos: Array2D
+        self.sat_vel: Array2D
+        self._set_views()
+
+    def apply_params(self, **params: float | str | None) -> None:
+        """Sets the parameters given as keyword arguments.
+        If any of them is invalid then the error is raised and none of the parameters are changed.
+        """
+        previous_params = {name: getattr(self, name) for name in params}
+
+        try:
+            for name, value in params.items():
+                setattr(self, name, value)
+
+        except (TypeError, ValueError):
+            for name, value in previous_params.items():
+                setattr(self, name, value)
+
+            raise
 
     @property
     def sim_time(self) -> float:
@@ -157,15 +214,15 @@ class Simulator:
 
         match self.lagrange_label:
             case "L1":
-                return planet_distance_meters * np.array((1, 0, 0)) - np.array((hill_radius, 0, 0))
+                return (planet_distance_meters - hill_radius) * X_UNIT_VECTOR
 
             case "L2":
-                return planet_distance_meters * np.array((1, 0, 0)) + np.array((hill_radius, 0, 0))
+                return (planet_distance_meters + hill_radius) * X_UNIT_VECTOR
 
             case "L3":
                 l3_dist = planet_distance_meters * 7 / 12 * self.planet_mass / self.star_mass
 
-                return -planet_distance_meters * np.array((1, 0, 0)) - np.array((l3_dist, 0, 0))
+                return -(planet_distance_meters + l3_dist) * X_UNIT_VECTOR
 
             case "L4":
                 return planet_distance_meters * unit_vector(np.pi / 3)
@@ -213,27 +270,46 @@ class Simulator:
         if len(self.star_pos) != self.num_steps + 1:
             self._allocate_arrays()
 
-        self._initialize_positions()
+        lagrange_point = self.calc_lagrange_point()
+
+        self._initialize_positions(lagrange_point)
 
         # we set up conditions so that the star and planet have circular orbits about the center of mass
         # so velocities have to be defined relative to the CM
         init_cm_pos = self.calc_center_of_mass(self.star_pos[0], self.planet_pos[0], self.sat_pos[0])
 
         self._initialize_velocities(init_cm_pos)
-        self._transform_to_cm_ref_frame(init_cm_pos)
+        self._transform_to_cm_ref_frame(init_cm_pos, lagrange_point)
 
     def _allocate_arrays(self) -> None:
-        self.star_pos = np.empty((self.num_steps + 1, 3), dtype=np.double)
-        self.star_vel = np.empty_like(self.star_pos)
-        self.planet_pos = np.empty_like(self.star_pos)
-        self.planet_vel = np.empty_like(self.star_pos)
-        self.sat_pos = np.empty_like(self.star_pos)
-        self.sat_vel = np.empty_like(self.star_pos)
+        self.state = np.empty((self.num_steps + 1, STATE_SIZE), dtype=np.double)
+        self._set_views()
+
+    def __getstate__(self) -> dict[str, object]:
+        # the position and velocity arrays are views into state, so they're recreated when unpickling
+        # instead of being pickled as copies
+        attributes = self.__dict__.copy()
+        for view_name in ("star_pos", "star_vel", "planet_pos", "planet_vel", "sat_pos", "sat_vel"):
+            del attributes[view_name]
 
-    def _initialize_positions(self) -> None:
-        self.star_pos[0] = np.array((0, 0, 0))
+        return attributes
 
-        self.planet_pos[0] = np.array((self.planet_distance * AU, 0, 0))
+    def __setstate__(self, attributes: dict[str, object]) -> None:
+        self.__dict__.update(attributes)
+        self._set_views()
+
+    def _set_views(self) -> None:
+        self.star_pos = self.state[:, STAR_POS : STAR_POS + 3]
+        self.star_vel = self.state[:, STAR_VEL : STAR_VEL + 3]
+        self.planet_pos = self.state[:, PLANET_POS : PLANET_POS + 3]
+        self.planet_vel = self.state[:, PLANET_VEL : PLANET_VEL + 3]
+        self.sat_pos = self.state[:, SAT_POS : SAT_POS + 3]
+        self.sat_vel = self.state[:, SAT_VEL : SAT_VEL + 3]
+
+    def _initialize_positions(self, lagrange_point: Array1D) -> None:
+        self.star_pos[0] = 0
+
+        self.planet_pos[0] = self.planet_distance * AU * X_UNIT_VECTOR
 
         # Perturbation of satellite's position away from the lagrange point
         perturbation_size = self.perturbation_size * AU
@@ -241,7 +317,7 @@ class Simulator:
 
         perturbation = perturbation_size * np.array((np.cos(perturbation_angle), np.sin(perturbation_angle), 0))
 
-        self.sat_pos[0] = self.calc_lagrange_point() + perturbation
+        self.sat_pos[0] = lagrange_point + perturbation
 
     # noinspection PyUnreachableCode
     def _initialize_velocities(self, init_cm_pos: Array1D) -> None:
@@ -255,18 +331,19 @@ class Simulator:
 
         self.planet_vel[0] = np.cross(angular_vel, self.planet_pos[0] - init_cm_pos)
 
-        speed = self.speed * norm(self.planet_vel[0])
+        # hypot avoids numpy.linalg.norm's dispatch overhead on a single 3-vector
+        speed = self.speed * hypot(*self.planet_vel[0])
 
         vel_angle = float(np.radians(self.actual_vel_angle))
 
         self.sat_vel[0] = speed * unit_vector(vel_angle)
 
-    def _transform_to_cm_ref_frame(self, init_cm_pos: Array1D) -> None:
+    def _transform_to_cm_ref_frame(self, init_cm_pos: Array1D, lagrange_point: Array1D) -> None:
         self.star_pos[0] -= init_cm_pos
         self.planet_pos[0] -= init_cm_pos
         self.sat_pos[0] -= init_cm_pos
 
-        self.lagrange_point_trans = self.calc_lagrange_point() - init_cm_pos
+        self.lagrange_point_trans = lagrange_point - init_cm_pos
 
     def _integrate(self) -> None:
         nb_integrate(
@@ -274,12 +351,7 @@ class Simulator:
             self.num_steps,
             self.star_mass,
             self.planet_mass,
-            self.star_pos,
-            self.star_vel,
-            self.planet_pos,
-            self.planet_vel,
-            self.sat_pos,
-            self.sat_vel,
+            self.state,
         )
 
     A = TypeVar("A", Array1D, Array2D)
@@ -299,13 +371,44 @@ class Simulator:
         ) / (self.star_mass + self.planet_mass + self.SAT_MASS)
 
     def transform_to_corotating(self, pos_trans: Array2D) -> Array2D:
+        """Transforms pos_trans to a frame of reference that rotates at a rate of angular_speed counter-clockwise.
+        pos_trans is assumed to be an array of positions measured relative to the center of rotation.
+        """
+        # w is the angular speed, t is the time
+        # we transform pos_trans by linearly transforming each position vector by the inverse of the basis transform
+        # the coordinate transform is unit(x) -> R(w*t)*unit(x), unit(y) -> R(w*t)*unit(y)
+        # where R(w*t) is the rotation matrix with angle w*t about the z axis
+        # the inverse is R(-w*t)
+        # at each time t we apply the matrix R(-w*t) to the position vector
         angular_speed = self.angular_speed * np.sign(self.time_step_in_seconds)
-        return nb_transform_to_corotating(pos_trans, self.time_points(), angular_speed)
 
-    def calc_conserved_quantities(self) -> tuple[Array2D, Array2D, Array1D]:
-        total_momentum = self.calc_total_linear_momentum()
-        total_angular_momentum = self.calc_total_angular_momentum()
+        # the angles are generated directly rather than by scaling time_points(), which saves a pass over the array
+        # and the sines overwrite them since they aren't needed afterwards
+        angles = np.linspace(0, -angular_speed * self.sim_time, self.num_steps + 1)
+        cos_angles = np.cos(angles)
+        sin_angles = np.sin(angles, out=angles)
+
+        # only long simulations have enough points to pay for the parallel kernel's dispatch
+        if self.num_steps > PARALLEL_TRANSFORM_MIN_STEPS:
+            return nb_transform_to_corotating_parallel(pos_trans, cos_angles, sin_angles)
+
+        return nb_transform_to_corotating(pos_trans, cos_angles, sin_angles)
+
+    def calc_conserved_quantities(self, executor: Executor | None = None) -> tuple[Array2D, Array2D, Array1D]:
+        """Returns the total linear momentum, angular momentum, and energy of the system at each time point.
+        If an executor is given, the momenta are submitted to it and calculated in parallel with the energy.
+        A momentum which hasn't started by the time the energy is done is calculated in this thread instead,
+        so this can't deadlock when it's run by a worker of the executor itself.
+        """
+        if executor is None:
+            return self.calc_total_linear_momentum(), self.calc_total_angular_momentum(), self.calc_total_energy()
+
+        momentum_future = executor.submit(self.calc_total_linear_momentum)
+        angular_momentum_future = executor.submit(self.calc_total_angular_momentum)
+
         total_energy = self.calc_total_energy()
+        total_momentum = _result_or_call(momentum_future, self.calc_total_linear_momentum)
+        total_angular_momentum = _result_or_call(angular_momentum_future, self.calc_total_angular_momentum)
 
         return total_momentum, total_angular_momentum, total_energy
 
@@ -323,24 +426,22 @@ class Simulator:
         return star_angular_momentum + planet_angular_momentum + sat_angular_momentum  # type: ignore[return-value]
 
     def calc_total_energy(self) -> Array1D:
-        planet_to_star_distance = array_of_norms(self.star_pos - self.planet_pos)
-        planet_to_sat_distance = array_of_norms(self.sat_pos - self.planet_pos)
-        star_to_sat_distance = array_of_norms(self.sat_pos - self.star_pos)
-
-        potential_energy = -G * (
-            self.star_mass * self.planet_mass / planet_to_star_distance
-            + self.SAT_MASS * self.planet_mass / planet_to_sat_distance
-            + self.SAT_MASS * self.star_mass / star_to_sat_distance
-        )
+        return nb_total_energy(self.state, self.star_mass, self.planet_mass, self.SAT_MASS)
 
-        star_vel_magnitude = array_of_norms(self.star_vel)
-        planet_vel_magnitude = array_of_norms(self.planet_vel)
-        sat_vel_magnitude = array_of_norms(self.sat_vel)
 
-        kinetic_energy = 0.5 * (
-            self.star_mass * star_vel_magnitude**2
-            + self.planet_mass * planet_vel_magnitude**2
-            + self.SAT_MASS * sat_vel_magnitude**2
-        )
+def simulate_batch(simulators: Iterable[Simulator], max_workers: int | None = None) -> list[Simulator]:
+    """Simulates each of simulators in a pool of processes and returns the simulated copies in the same order.
+    The simulations are independent so a batch, e.g. a sweep over perturbations, scales with the number of cores.
+    Processes rather than threads are used so that setting up each simulation doesn't contend for the GIL.
+    The processes are spawned rather than forked, a fork of a process in which numba has started its threading layer
+    can leave the interpreter hanging at exit. Scripts which call this must guard their entry point with
+    if __name__ == "__main__".
+    """
+    with ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(_simulate, simulators))
+
+
+def _simulate(sim: Simulator) -> Simulator:
+    sim.simulate()
 
-        return potential_energy + kinetic_energy
+    return sim
@@ -0,0 +1,60 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.lagrangepointgui import presets
+from src.lagrangepointgui.presets import clear_presets_cache, flattened_preset, preload_presets
+
+USER_PRESETS = """
+[presets]
+"Mine" = { bases = ["Sun Erth"] }
+"Top" = { "planet distance" = 1.0 }
+"Left" = { bases = ["Top"], "planet distance" = 2.0, "star mass" = "left" }
+"Right" = { bases = ["Top"], "planet distance" = 3.0, "planet mass" = "right" }
+"Bottom" = { bases = ["Left", "Right"], "initial speed" = 0.5 }
+"""
+
+
+class FlattenedPresetTest(unittest.TestCase):
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+
+        user_presets_path = Path(temp_dir.name) / "user_presets.toml"
+        user_presets_path.write_text(USER_PRESETS)
+
+        patcher = mock.patch.object(presets, "user_presets_path", user_presets_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        clear_presets_cache()
+        self.addCleanup(clear_presets_cache)
+
+    def test_missing_base_only_breaks_its_preset(self) -> None:
+        with self.assertRaisesRegex(ValueError, "Sun Erth"):
+            flattened_preset("Mine")
+
+        assert flattened_preset("Sun Jupiter")["planet mass"] == "jupiter_mass"
+
+    def test_unknown_preset(self) -> None:
+        with self.assertRaisesRegex(ValueError, "Unknown preset"):
+            flattened_preset("Nonexistent")
+
+    def test_preload_skips_invalid_presets(self) -> None:
+        preload_presets()
+
+        assert flattened_preset("Default")["Lagrange label"] == "L4"
+
+    def test_diamond_bases(self) -> None:
+        # Top is applied once, before Left, so it doesn't overwrite Left's planet distance
+        assert flattened_preset("Bottom") == {
+            "planet distance": "3.0",
+            "star mass": "left",
+            "planet mass": "right",
+            "initial speed": "0.5",
+        }
+
+
+if __name__ == "__main__":
+    unittest.main()
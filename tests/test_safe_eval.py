@@ -0,0 +1,55 @@
+import unittest
+
+from src.lagrangepointgui.safe_eval import safe_eval
+from src.lagrangepointsimulator.constants import SUN_MASS
+
+ACCEPTED: tuple[tuple[str, int | float | None], ...] = (
+    ("", None),
+    ("7", 7),
+    (" 1.5 ", 1.5),
+    ("1e3", 1000.0),
+    ("1 + 2 * 3", 7),
+    ("-(1 + 2) * 3", -9),
+    ("+4 - 1", 3),
+    ("1 / 4", 0.25),
+    ("7 // 2", 3),
+    ("2 ** 10", 1024),
+    ("sun_mass", SUN_MASS),
+    ("sun_mass // 25", SUN_MASS // 25),
+)
+
+REJECTED: tuple[tuple[str, type[Exception]], ...] = (
+    ("__builtins__", TypeError),
+    ("__import__('os')", ValueError),
+    ("abs(-1)", ValueError),
+    ("sun_mass.real", ValueError),
+    ("(1).__class__", ValueError),
+    ("'text'", ValueError),
+    ("b'bytes'", ValueError),
+    ("1j", ValueError),
+    ("True", ValueError),
+    ("None", ValueError),
+    ("[1]", ValueError),
+    ("1 if 1 else 2", ValueError),
+    ("lambda: 1", ValueError),
+    ("7 % 2", ValueError),
+    ("1 / 0", ValueError),
+    ("unknown_constant", ValueError),
+    ("1 +", ValueError),
+)
+
+
+class SafeEvalTest(unittest.TestCase):
+    def test_accepted(self) -> None:
+        for expr, expected in ACCEPTED:
+            with self.subTest(expr=expr):
+                assert safe_eval(expr) == expected
+
+    def test_rejected(self) -> None:
+        for expr, exception in REJECTED:
+            with self.subTest(expr=expr), self.assertRaises(exception):
+                safe_eval(expr)
+
+
+if __name__ == "__main__":
+    unittest.main()
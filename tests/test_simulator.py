@@ -0,0 +1,33 @@
+import unittest
+
+import numpy as np
+
+from src.lagrangepointsimulator.simulator import Simulator, array_of_norms, simulate_batch
+
+
+class ArrayOfNormsTest(unittest.TestCase):
+    def test_integer_vectors(self) -> None:
+        vectors = np.array([[1, 1, 1], [3, 4, 0]])
+
+        np.testing.assert_allclose(array_of_norms(vectors), [np.sqrt(3), 5.0])
+
+
+class SimulateBatchTest(unittest.TestCase):
+    def test_matches_simulate(self) -> None:
+        perturbation_sizes = (0.0, 0.02, 0.05)
+
+        simulators = [Simulator(num_years=0.1, perturbation_size=size) for size in perturbation_sizes]
+
+        batch = simulate_batch(simulators, max_workers=2)
+
+        assert len(batch) == len(simulators)
+
+        for sim, batch_sim in zip(simulators, batch, strict=True):
+            sim.simulate()
+
+            assert batch_sim.perturbation_size == sim.perturbation_size
+            np.testing.assert_array_equal(batch_sim.state, sim.state)
+
+
+if __name__ == "__main__":
+    unittest.main()